@@ -0,0 +1,334 @@
+"""
+Response caching for the AI adapters.
+Identical requests are served from an in-process LRU backed by an on-disk SQLite store,
+so repeated learning sessions don't pay for the same completion twice. Paraphrased
+questions can additionally be matched by embedding similarity.
+"""
+
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value):
+    """Serialize a value to JSON text, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False)
+
+
+def loads(text):
+    """Parse JSON text or bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _feed(hasher, value):
+    """
+    Feed a value into a hash without serializing it to JSON first.
+
+    Every value is tagged with its type and strings and containers with their
+    length, so distinct structures can't produce the same byte stream.
+    """
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        hasher.update(b"s%d:" % len(data))
+        hasher.update(data)
+    elif isinstance(value, dict):
+        hasher.update(b"d%d:" % len(value))
+        for key in sorted(value):
+            _feed(hasher, key)
+            _feed(hasher, value[key])
+    elif isinstance(value, (list, tuple)):
+        hasher.update(b"l%d:" % len(value))
+        for item in value:
+            _feed(hasher, item)
+    else:
+        hasher.update(b"v" + repr(value).encode("utf-8") + b";")
+
+
+def make_cache_key(**parts):
+    """
+    Build a stable cache key from the parts of a request.
+
+    Args:
+        **parts: Strings, numbers, lists and dicts identifying the request
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    hasher = hashlib.blake2b()
+    _feed(hasher, parts)
+    return hasher.hexdigest()
+
+
+class ResponseCache:
+    """Exact-match response cache with an in-memory LRU in front of SQLite."""
+
+    def __init__(self, cache_dir="~/.cache/learnflow_llm", ttl=7 * 24 * 3600, max_memory_items=512):
+        """
+        Initialize the response cache.
+
+        Args:
+            cache_dir (str, optional): Directory holding the SQLite database
+            ttl (int, optional): Seconds before an entry expires. Defaults to 7 days.
+            max_memory_items (int, optional): Entries kept in the in-memory LRU
+        """
+        self.ttl = ttl
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        cache_dir = os.path.expanduser(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "responses.sqlite3")
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, created REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+        self._purge_expired(time.time())
+        self._db.commit()
+
+    def _purge_expired(self, now):
+        """Delete rows older than the TTL, so the database doesn't grow without bound."""
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+
+    def _remember(self, key, value, created):
+        """Put an entry in the in-memory LRU, evicting the oldest if full."""
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (loads(row[0]), row[1])
+
+            if entry is None or now - entry[1] > self.ttl:
+                if entry is not None:
+                    self._memory.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._remember(key, *entry)
+            self.hits += 1
+            # Hand out a copy so callers can't mutate the cached object
+            return copy.deepcopy(entry[0])
+
+    def set(self, key, value):
+        """
+        Store a value in the cache.
+
+        Args:
+            key (str): The cache key
+            value: A JSON-serializable value
+        """
+        created = time.time()
+        with self._lock:
+            self._remember(key, copy.deepcopy(value), created)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                (key, dumps(value), created)
+            )
+            self._purge_expired(created)
+            self._db.commit()
+
+    def clear(self):
+        """Remove every cached entry from memory and disk."""
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Report cache usage.
+
+        Returns:
+            dict: Hit/miss counters and entry counts
+        """
+        with self._lock:
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+def _normalize(vector):
+    """Scale a vector to unit length so a dot product gives cosine similarity."""
+    norm = sum(x * x for x in vector) ** 0.5
+    if not norm:
+        return None
+    return [x / norm for x in vector]
+
+
+class SemanticCache:
+    """Embedding-keyed cache that serves answers for near-duplicate queries."""
+
+    def __init__(self, cache_dir=None, max_items_per_scope=256, max_items=4096, max_memory_items=1024):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            cache_dir (str, optional): Directory holding the SQLite database, or None to keep
+                entries in memory only
+            max_items_per_scope (int, optional): Entries kept per scope before the oldest is dropped
+            max_items (int, optional): Entries kept on disk across all scopes before the oldest
+                are dropped
+            max_memory_items (int, optional): Entries kept in memory across all scopes before the
+                least recently used scopes are unloaded
+        """
+        self.max_items_per_scope = max_items_per_scope
+        self.max_items = max_items
+        self.max_memory_items = max_memory_items
+        self._scopes = OrderedDict()
+        self._memory_items = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+        if cache_dir is not None:
+            cache_dir = os.path.expanduser(cache_dir)
+            os.makedirs(cache_dir, exist_ok=True)
+            self.path = os.path.join(cache_dir, "responses.sqlite3")
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS semantic "
+                "(id INTEGER PRIMARY KEY, scope TEXT, vector TEXT, value TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS semantic_scope ON semantic (scope, id)")
+            self._db.commit()
+
+    def _entries(self, scope):
+        """
+        Return the in-memory entries of a scope, loading them from disk on first use.
+
+        Scopes are kept in least recently used order, so the oldest can be unloaded
+        when memory is full. The caller must hold the lock.
+        """
+        entries = self._scopes.get(scope)
+        if entries is None:
+            entries = []
+            if self._db is not None:
+                rows = self._db.execute(
+                    "SELECT id, vector, value FROM semantic WHERE scope = ? ORDER BY id DESC LIMIT ?",
+                    (scope, self.max_items_per_scope)
+                ).fetchall()
+                entries = [(row_id, array("d", loads(vector)), loads(value)) for row_id, vector, value in reversed(rows)]
+            self._scopes[scope] = entries
+            self._memory_items += len(entries)
+        self._scopes.move_to_end(scope)
+        return entries
+
+    def _unload_scopes(self):
+        """Drop the least recently used scopes until memory is within its limit, keeping the newest."""
+        while self._memory_items > self.max_memory_items and len(self._scopes) > 1:
+            _, entries = self._scopes.popitem(last=False)
+            self._memory_items -= len(entries)
+
+    def lookup(self, scope, embedding, threshold=0.95):
+        """
+        Find the cached value whose query is most similar to the given embedding.
+
+        Args:
+            scope (str): Key of everything besides the query that must match exactly
+            embedding (list): Embedding of the query
+            threshold (float, optional): Minimum cosine similarity for a hit
+
+        Returns:
+            The cached value, or None if no entry is similar enough
+        """
+        query = _normalize(embedding)
+        if query is None:
+            return None
+
+        best_score, best_value = threshold, None
+        with self._lock:
+            entries = self._entries(scope)
+            for _, vector, value in entries:
+                score = sum(a * b for a, b in zip(query, vector))
+                if score >= best_score:
+                    best_score, best_value = score, value
+            self._unload_scopes()
+        return best_value
+
+    def add(self, scope, embedding, value):
+        """
+        Remember a value for a query embedding.
+
+        Args:
+            scope (str): Key of everything besides the query that must match exactly
+            embedding (list): Embedding of the query
+            value: The value to cache
+        """
+        vector = _normalize(embedding)
+        if vector is None:
+            return
+
+        with self._lock:
+            entries = self._entries(scope)
+            row_id = None
+            if self._db is not None:
+                row_id = self._db.execute(
+                    "INSERT INTO semantic (scope, vector, value) VALUES (?, ?, ?)",
+                    (scope, dumps(vector), dumps(value))
+                ).lastrowid
+                # Ids only grow, so everything this far behind the newest row is the oldest overflow
+                self._db.execute("DELETE FROM semantic WHERE id <= ?", (row_id - self.max_items,))
+
+            # Vectors are stored as packed doubles, a fraction of the size of a list of floats
+            entries.append((row_id, array("d", vector), value))
+            self._memory_items += 1
+            if len(entries) > self.max_items_per_scope:
+                evicted_id = entries.pop(0)[0]
+                self._memory_items -= 1
+                if evicted_id is not None:
+                    self._db.execute("DELETE FROM semantic WHERE id = ?", (evicted_id,))
+
+            if self._db is not None:
+                self._db.commit()
+            self._unload_scopes()
+
+    def clear(self):
+        """Remove every cached entry from memory and disk."""
+        with self._lock:
+            self._scopes.clear()
+            self._memory_items = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM semantic")
+                self._db.commit()
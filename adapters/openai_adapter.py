@@ -1,29 +1,370 @@
 import os
-import time
 import json
-import openai
-import hooks
+import logging
+import random
+import asyncio
+import threading
 from pathlib import Path
+from functools import lru_cache
+from dataclasses import dataclass, field
+from .cache import ResponseCache, SemanticCache, make_cache_key
+from .ratelimit import RateBudget, estimate_tokens
+from .prompts import (
+    QA_SYSTEM_PROMPT, QA_PROMPT,
+    EXPLAIN_WITH_CONTEXT_SYSTEM_PROMPT, EXPLAIN_WITH_CONTEXT_PROMPT,
+    EXPLAIN_SYSTEM_PROMPT, EXPLAIN_PROMPT,
+    EXAMPLES_SYSTEM_PROMPT, EXAMPLES_WITH_CONTEXT_PROMPT, EXAMPLES_PROMPT,
+    SUMMARY_LEVEL_SYSTEM_PROMPT, SUMMARY_LEVEL_SCHEMA, SUMMARY_LEVEL_PROMPT
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+# Pooled HTTP clients keyed by base URL, shared by every model on that endpoint
+_ASYNC_HTTP_CLIENTS = {}
+
+# SDK clients keyed by (api_key, base_url), shared by every model with those credentials
+_ASYNC_CLIENTS = {}
+_CLIENT_LOCK = threading.Lock()
+
+# Background event loop that runs every async API call
+_LOOP = None
+_LOOP_LOCK = threading.Lock()
+
+# Response caches shared by every model, created on first use
+_RESPONSE_CACHE = None
+_SEMANTIC_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+# Prefix of the text returned in place of a completion when a request fails
+_ERROR_PREFIX = "[Error]"
+
+# Attempts made for a request before a transient error is surfaced
+_MAX_ATTEMPTS = 6
+
+
+def is_error_response(text):
+    """
+    Check whether text returned by the adapter is an error message instead of a completion.
+    
+    Failed requests are reported as values, not exceptions, so callers that cache
+    or store results use this to tell the two apart.
+    
+    Args:
+        text (str): A completion, or a delta of a streamed one
+    
+    Returns:
+        bool: True if the text is an error message
+    """
+    return isinstance(text, str) and text.lstrip().startswith(_ERROR_PREFIX)
+
+
+def _get_async_http_client(base_url=None):
+    """Return the shared keep-alive async HTTP client for an API endpoint."""
+    http_client = _ASYNC_HTTP_CLIENTS.get(base_url)
+    if http_client is None:
+        import httpx
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            # Completions can take minutes to generate, so only the connect timeout is short
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            http2=True
+        )
+        _ASYNC_HTTP_CLIENTS[base_url] = http_client
+    return http_client
+
+
+def _client_kwargs(api_key, base_url, http_client):
+    """Keyword arguments for the SDK clients, on top of a pooled HTTP client."""
+    client_kwargs = {"api_key": api_key, "http_client": http_client}
+    if base_url:
+        client_kwargs["base_url"] = base_url
+    
+    # Retries are handled by _acall_api so they can be logged and tuned in one place
+    client_kwargs["max_retries"] = 0
+    return client_kwargs
+
+
+def _get_async_client(api_key, base_url=None):
+    """Return the shared async OpenAI client for an API key and endpoint."""
+    with _CLIENT_LOCK:
+        client = _ASYNC_CLIENTS.get((api_key, base_url))
+        if client is None:
+            import openai
+            client = openai.AsyncOpenAI(**_client_kwargs(api_key, base_url, _get_async_http_client(base_url)))
+            _ASYNC_CLIENTS[(api_key, base_url)] = client
+    return client
+
+
+def _get_event_loop():
+    """Return the background event loop, starting it on first use."""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_LOOP.run_forever, name="ai-adapter-loop", daemon=True).start()
+    return _LOOP
+
+
+def _get_response_cache():
+    """Return the shared response cache, creating it on first use."""
+    global _RESPONSE_CACHE
+    with _CACHE_LOCK:
+        if _RESPONSE_CACHE is None:
+            _RESPONSE_CACHE = ResponseCache(
+                cache_dir=os.getenv("LLM_CACHE_DIR", "~/.cache/learnflow_llm"),
+                ttl=int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+            )
+    return _RESPONSE_CACHE
+
+
+def _get_semantic_cache():
+    """Return the shared semantic cache, creating it on first use."""
+    global _SEMANTIC_CACHE
+    with _CACHE_LOCK:
+        if _SEMANTIC_CACHE is None:
+            _SEMANTIC_CACHE = SemanticCache(cache_dir=os.getenv("LLM_CACHE_DIR", "~/.cache/learnflow_llm"))
+    return _SEMANTIC_CACHE
+
+
+def _retryable_errors():
+    """Transient API errors worth retrying with backoff; 400/401/404 are not retried."""
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    )
+
+
+def _should_retry(error):
+    """
+    Decide whether a transient API error is worth another attempt.
+    
+    A timeout is only retried when the request never reached the server (connect or
+    pool timeout). A read timeout means the model was already generating, so a retry
+    would be billed again and most likely time out the same way.
+    
+    Args:
+        error (Exception): The error raised by the failed call
+    
+    Returns:
+        bool: True if the call should be retried
+    """
+    import httpx
+    import openai
+    if isinstance(error, openai.APITimeoutError):
+        return isinstance(error.__cause__, (httpx.ConnectTimeout, httpx.PoolTimeout))
+    return True
+
+
+def _retry_delay(error, attempt):
+    """
+    Seconds to wait before retrying a failed API call.
+    
+    Honours the Retry-After header on rate limit responses and otherwise uses
+    exponential backoff with random jitter; either way the wait is capped at 60 seconds.
+    
+    Args:
+        error (Exception): The error raised by the failed call
+        attempt (int): Number of attempts made so far
+    
+    Returns:
+        float: Seconds to wait
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(60.0, max(0.0, float(response.headers.get("retry-after"))))
+        except (TypeError, ValueError):
+            pass
+    return max(1.0, random.uniform(0, min(60, 2 ** attempt)))
+
+
+# Per-source (marker, prefix) pairs used when folding messages into user turns
+_SOURCE_PREFIXES = {}
+
+
+def _rewrite_message(msg, model_name):
+    """
+    Transform one message for API compatibility.
+    
+    System messages are kept as is, messages from this model become assistant
+    messages, and messages from other sources (user or other models) become user
+    messages with the source prepended to the content.
+    
+    Args:
+        msg (dict): Message dictionary with role and content
+        model_name (str): Display name of the model the request is for
+    
+    Returns:
+        dict: The message to send to the API
+    """
+    role = msg["role"]
+    if role == "system":
+        return msg
+    if role == model_name:
+        return {"role": "assistant", "content": msg["content"]}
+    
+    marker_prefix = _SOURCE_PREFIXES.get(role)
+    if marker_prefix is None:
+        marker_prefix = _SOURCE_PREFIXES.setdefault(role, (f"{role}:", f"{role}: "))
+    
+    # Only prepend source if it's not already there
+    content = msg["content"]
+    if not content.startswith(marker_prefix[0]):
+        content = marker_prefix[1] + content
+    return {"role": "user", "content": content}
+
+
+async def _aiter_deltas(stream):
+    """
+    Yield the text deltas of a streamed completion as they arrive.
+    
+    Nothing is accumulated, so memory stays constant however long the completion is.
+    
+    Args:
+        stream (AsyncStream): Streamed chat completion chunks
+    
+    Yields:
+        str: Each non-empty content delta
+    """
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+
+def run_sync(coro):
+    """
+    Run a coroutine on the background event loop and wait for its result.
+    
+    A single long-lived loop keeps the async HTTP pool and semaphores bound to
+    one loop, which repeated asyncio.run() calls would not.
+    
+    Args:
+        coro (coroutine): The coroutine to run
+    
+    Returns:
+        The coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+
+async def _anext(agen):
+    """Await the next item of an async iterator."""
+    return await agen.__anext__()
+
+
+def iter_sync(agen):
+    """
+    Iterate an async generator from synchronous code via the background event loop.
+    
+    Args:
+        agen (async_generator): The async generator to drive
+    
+    Yields:
+        Each item produced by the async generator
+    """
+    try:
+        while True:
+            try:
+                yield run_sync(_anext(agen))
+            except StopAsyncIteration:
+                return
+    finally:
+        run_sync(agen.aclose())
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    """Validated settings for one model entry in key.json."""
+    name: str
+    model_name: str = "gpt-4"
+    api_key: str = None
+    base_url: str = None
+    max_completion_tokens: int = 1000
+    extra_body: dict = field(default_factory=dict)
+    embedding_model: str = None
+    semantic_cache_threshold: float = 0.95
+    requests_per_minute: int = None
+    tokens_per_minute: int = None
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Validate a raw model entry and build a ModelConfig from it.
+        
+        Args:
+            data (dict): The model entry from the configuration file
+        
+        Returns:
+            ModelConfig: The validated configuration
+        
+        Raises:
+            ValueError: If the entry is not an object with a name
+        """
+        if not isinstance(data, dict) or not data.get("name"):
+            raise ValueError(f"Model entry must be an object with a name: {data!r}")
+        
+        # Unknown keys are ignored and null values fall back to the defaults
+        known = {f.name for f in cls.__dataclass_fields__.values()}
+        values = {key: value for key, value in data.items() if key in known and value is not None}
+        return cls(**values)
+
+
+@lru_cache(maxsize=4)
+def _load_model_configs(config_path):
+    """
+    Parse and validate a configuration file, once per path.
+    
+    Args:
+        config_path (str): Path to the configuration JSON file
+    
+    Returns:
+        tuple: The ModelConfig for every configured model
+    """
+    raw = Path(config_path).read_bytes()
+    config = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return tuple(ModelConfig.from_dict(model) for model in config.get("models", []))
+
 
 class AIAdapter:
     """Universal adapter for multiple AI models."""
     
-    def __init__(self, config_path="key.json", model_name=None):
+    def __init__(self, config_path="key.json", model_name=None, max_concurrency=None):
         """
         Initialize the AI adapter with configuration from a JSON file.
         
         Args:
             config_path (str): Path to the configuration JSON file
             model_name (str, optional): Name of the specific model to use from config
+            max_concurrency (int, optional): Maximum in-flight async requests.
+                Defaults to the OPENAI_CONCURRENCY environment variable, or 8.
+        """
+        self._setup(self._load_config(config_path), model_name, max_concurrency)
+    
+    def _setup(self, model_configs, model_name=None, max_concurrency=None):
+        """
+        Create the configured models and select the active one.
+        
+        Args:
+            model_configs (tuple): ModelConfig for every model to create
+            model_name (str, optional): Name of the specific model to use from config
+            max_concurrency (int, optional): Maximum in-flight async requests
         """
-        # Load configuration
-        self.config = self._load_config(config_path)
+        self.model_configs = model_configs
         self.models = {}
         
         # Initialize all models from config or select one specific model
-        for model_config in self.config.get("models", []):
-            model_instance = self._create_model_instance(model_config)
-            self.models[model_config["name"]] = model_instance
+        for model_config in model_configs:
+            self.models[model_config.name] = self._create_model_instance(model_config)
             
         # Set the active model (either specified or first in config)
         if model_name and model_name in self.models:
@@ -32,25 +373,33 @@ class AIAdapter:
             self.active_model = next(iter(self.models.values()))
         else:
             raise ValueError("No models configured")
+        
+        # Bound the number of in-flight requests issued through the async path
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("OPENAI_CONCURRENCY", "8"))
+        self._sem = asyncio.Semaphore(max_concurrency)
     
     def _load_config(self, config_path):
-        """Load configuration from a JSON file."""
+        """Load and validate configuration from a JSON file (parsed once per path)."""
         try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error loading configuration: {str(e)}")
-            return {"models": []}
+            return _load_model_configs(config_path)
+        except (OSError, ValueError) as e:
+            log.error("Error loading configuration from %s: %s", config_path, e)
+            return ()
     
     def _create_model_instance(self, model_config):
-        """Create an instance of AIModel from configuration."""
+        """Create an instance of AIModel from a validated ModelConfig."""
         return AIModel(
-            name=model_config.get("name", "Default"),
-            model_name=model_config.get("model_name", "gpt-4"),
-            api_key=model_config.get("api_key"),
-            base_url=model_config.get("base_url"),
-            max_completion_tokens=model_config.get("max_completion_tokens", 1000),
-            extra_body=model_config.get("extra_body", {})
+            name=model_config.name,
+            model_name=model_config.model_name,
+            api_key=model_config.api_key,
+            base_url=model_config.base_url,
+            max_completion_tokens=model_config.max_completion_tokens,
+            extra_body=model_config.extra_body,
+            embedding_model=model_config.embedding_model,
+            semantic_cache_threshold=model_config.semantic_cache_threshold,
+            requests_per_minute=model_config.requests_per_minute,
+            tokens_per_minute=model_config.tokens_per_minute
         )
     
     def set_active_model(self, model_name):
@@ -60,7 +409,87 @@ class AIAdapter:
             return True
         return False
     
-    def generate_completion(self, prompt, temperature=0.7, stream=False):
+    def cache_clear(self):
+        """Clear all cached responses."""
+        _get_response_cache().clear()
+        _get_semantic_cache().clear()
+    
+    def cache_stats(self):
+        """Return hit/miss counters and entry counts for the response cache."""
+        return _get_response_cache().stats()
+    
+    def _semantic_cached(self, scope, query, generate):
+        """
+        Serve a cached answer for a near-duplicate query, or generate and remember one.
+        
+        Only used when the active model has an embedding model configured.
+        
+        Args:
+            scope (str): Key of everything besides the query that must match exactly
+            query (str): The free-form text that may be paraphrased between calls
+            generate (callable): Produces the answer on a cache miss
+        
+        Returns:
+            str: The cached or newly generated answer
+        """
+        model = self.active_model
+        embedding = model.embed(query) if model.embedding_model else None
+        if embedding is None:
+            return generate()
+        
+        cache = _get_semantic_cache()
+        answer = cache.lookup(scope, embedding, model.semantic_cache_threshold)
+        if answer is None:
+            answer = generate()
+            if not is_error_response(answer):
+                cache.add(scope, embedding, answer)
+        return answer
+    
+    def _semantic_cached_stream(self, scope, query, generate):
+        """
+        Streaming counterpart of _semantic_cached.
+        
+        A cached answer is yielded in one piece; otherwise the generated deltas are
+        passed through and the full answer is remembered once the stream completes
+        without an error.
+        
+        Args:
+            scope (str): Key of everything besides the query that must match exactly
+            query (str): The free-form text that may be paraphrased between calls
+            generate (callable): Returns an iterator of text deltas on a cache miss
+        
+        Yields:
+            str: The cached answer, or text deltas of the new one
+        """
+        model = self.active_model
+        embedding = model.embed(query) if model.embedding_model else None
+        if embedding is None:
+            yield from generate()
+            return
+        
+        cache = _get_semantic_cache()
+        answer = cache.lookup(scope, embedding, model.semantic_cache_threshold)
+        if answer is not None:
+            yield answer
+            return
+        
+        parts = []
+        failed = False
+        for delta in generate():
+            failed = failed or is_error_response(delta)
+            parts.append(delta)
+            yield delta
+        if not failed:
+            cache.add(scope, embedding, "".join(parts))
+    
+    def _build_messages(self, prompt, system_prompt=None):
+        """Build the message list, putting the invariant system prompt first."""
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        return messages
+    
+    def generate_completion(self, prompt, temperature=0.7, stream=False, system_prompt=None, response_format=None):
         """
         Generate a text completion using the active AI model.
         
@@ -68,12 +497,86 @@ class AIAdapter:
             prompt (str): The prompt to generate completion for
             temperature (float, optional): Sampling temperature. Defaults to 0.7.
             stream (bool, optional): Whether to stream the response. Defaults to False.
+            system_prompt (str, optional): Static instructions sent ahead of the prompt. Defaults to None.
+            response_format (dict, optional): Structured output format for the API. Defaults to None.
+        
+        Returns:
+            str: The generated completion, or an iterator of text deltas when streaming
+        """
+        messages = self._build_messages(prompt, system_prompt)
+        return self.active_model.generate_response(
+            messages, stream=stream, response_format=response_format, temperature=temperature
+        )
+    
+    async def agenerate_completion(self, prompt, temperature=0.7, system_prompt=None, response_format=None):
+        """
+        Asynchronously generate a text completion using the active AI model.
+        
+        Args:
+            prompt (str): The prompt to generate completion for
+            temperature (float, optional): Sampling temperature. Defaults to 0.7.
+            system_prompt (str, optional): Static instructions sent ahead of the prompt. Defaults to None.
+            response_format (dict, optional): Structured output format for the API. Defaults to None.
         
         Returns:
             str: The generated completion
         """
-        messages = [{"role": "user", "content": prompt}]
-        return self.active_model.generate_response(messages)
+        messages = self._build_messages(prompt, system_prompt)
+        async with self._sem:
+            return await self.active_model.agenerate_response(
+                messages, response_format=response_format, temperature=temperature
+            )
+    
+    async def abatch_completions(self, prompts, temperature=0.7, system_prompt=None):
+        """
+        Generate completions for several independent prompts concurrently.
+        
+        Args:
+            prompts (list): The prompts to generate completions for
+            temperature (float, optional): Sampling temperature. Defaults to 0.7.
+            system_prompt (str, optional): Static instructions shared by every prompt. Defaults to None.
+        
+        Returns:
+            list: The generated completions, in the same order as the prompts
+        """
+        return await asyncio.gather(
+            *(self.agenerate_completion(p, temperature, system_prompt) for p in prompts)
+        )
+    
+    def batch_completions(self, prompts, temperature=0.7, system_prompt=None):
+        """
+        Synchronous wrapper around abatch_completions.
+        
+        Args:
+            prompts (list): The prompts to generate completions for
+            temperature (float, optional): Sampling temperature. Defaults to 0.7.
+            system_prompt (str, optional): Static instructions shared by every prompt. Defaults to None.
+        
+        Returns:
+            list: The generated completions, in the same order as the prompts
+        """
+        return run_sync(self.abatch_completions(prompts, temperature, system_prompt))
+    
+    def _qa_prompt(self, question, context):
+        """Return the (prompt, system_prompt) pair for a question about a context."""
+        return QA_PROMPT.format(context=context, question=question), QA_SYSTEM_PROMPT
+    
+    def _explain_prompt(self, line, context=None):
+        """Return the (prompt, system_prompt) pair for explaining a line."""
+        if context:
+            return EXPLAIN_WITH_CONTEXT_PROMPT.format(context=context, line=line), EXPLAIN_WITH_CONTEXT_SYSTEM_PROMPT
+        return EXPLAIN_PROMPT.format(line=line), EXPLAIN_SYSTEM_PROMPT
+    
+    def _examples_prompt(self, concept, example_types, context=None):
+        """Return the (prompt, system_prompt) pair for generating examples of a concept."""
+        example_types_str = ", ".join(example_types)
+        if context:
+            prompt = EXAMPLES_WITH_CONTEXT_PROMPT.format(
+                context=context, concept=concept, example_types=example_types_str
+            )
+        else:
+            prompt = EXAMPLES_PROMPT.format(concept=concept, example_types=example_types_str)
+        return prompt, EXAMPLES_SYSTEM_PROMPT
     
     def ask_question(self, question, context, temperature=0.7):
         """
@@ -87,24 +590,47 @@ class AIAdapter:
         Returns:
             str: The generated answer
         """
-        prompt = f"""
-Given the following context, please answer the question clearly and concisely.
-Only use information from the provided context. If you can't answer based on
-the context, say "I don't have enough information to answer this question."
-
-Context:
-{context}
-
-Question:
-{question}
-
-Answer:
-"""
-        # Get response and apply hooks
-        answer = self.generate_completion(prompt, temperature)
-        question, answer = hooks.on_qa_generate(question, answer)
+        prompt, system_prompt = self._qa_prompt(question, context)
+        
+        # Get response (reusing answers to paraphrased questions) and apply hooks
+        scope = make_cache_key(
+            kind="ask_question", model=self.active_model.model_name,
+            context=context, temperature=temperature
+        )
+        answer = self._semantic_cached(
+            scope, question, lambda: self.generate_completion(prompt, temperature, system_prompt=system_prompt)
+        )
+        import hooks
+        if hooks.on_qa_generate:
+            question, answer = hooks.on_qa_generate(question, answer)
         return answer
     
+    def ask_question_stream(self, question, context, temperature=0.7):
+        """
+        Stream an answer to a question given a context.
+        
+        Unlike ask_question, the QA hook is not applied; the caller should run it on
+        the full answer once the stream is consumed.
+        
+        Args:
+            question (str): The question to answer
+            context (str): The context to use for answering
+            temperature (float, optional): Sampling temperature. Defaults to 0.7.
+        
+        Returns:
+            Iterator[str]: Text deltas of the answer
+        """
+        prompt, system_prompt = self._qa_prompt(question, context)
+        
+        scope = make_cache_key(
+            kind="ask_question", model=self.active_model.model_name,
+            context=context, temperature=temperature
+        )
+        return self._semantic_cached_stream(
+            scope, question,
+            lambda: self.generate_completion(prompt, temperature, stream=True, system_prompt=system_prompt)
+        )
+    
     def explain_line(self, line, context=None, temperature=0.7):
         """
         Generate an explanation for a line of text.
@@ -117,41 +643,38 @@ Answer:
         Returns:
             str: The generated explanation
         """
-        if context:
-            prompt = f"""
-Provide a detailed explanation of the following line, using the context provided.
-Focus on making the explanation extremely clear and analytical.
-
-Context:
-{context}
-
-Line to explain:
-{line}
-
-Your explanation should cover:
-1. The meaning of the line
-2. Key concepts or terms
-3. How it relates to the broader context
-4. Any implicit assumptions or implications
-
-Explanation:
-"""
-        else:
-            prompt = f"""
-Provide a detailed explanation of the following line:
-Focus on making the explanation extremely clear and analytical.
-
-{line}
-
-Your explanation should cover:
-1. The meaning of the line
-2. Key concepts or terms
-3. Any implicit assumptions or implications
-4. Examples that clarify the concept (if relevant)
-
-Explanation:
-"""
-        return self.generate_completion(prompt, temperature)
+        prompt, system_prompt = self._explain_prompt(line, context)
+        
+        scope = make_cache_key(
+            kind="explain_line", model=self.active_model.model_name,
+            context=context, temperature=temperature
+        )
+        return self._semantic_cached(
+            scope, line, lambda: self.generate_completion(prompt, temperature, system_prompt=system_prompt)
+        )
+    
+    def explain_line_stream(self, line, context=None, temperature=0.7):
+        """
+        Stream an explanation for a line of text.
+        
+        Args:
+            line (str): The line to explain
+            context (str, optional): Additional context. Defaults to None.
+            temperature (float, optional): Sampling temperature. Defaults to 0.7.
+        
+        Returns:
+            Iterator[str]: Text deltas of the explanation
+        """
+        prompt, system_prompt = self._explain_prompt(line, context)
+        
+        scope = make_cache_key(
+            kind="explain_line", model=self.active_model.model_name,
+            context=context, temperature=temperature
+        )
+        return self._semantic_cached_stream(
+            scope, line,
+            lambda: self.generate_completion(prompt, temperature, stream=True, system_prompt=system_prompt)
+        )
     
     def generate_examples(self, concept, example_types, context=None, temperature=0.7):
         """
@@ -166,38 +689,75 @@ Explanation:
         Returns:
             str: The generated examples
         """
-        example_types_str = ", ".join(example_types)
+        prompt, system_prompt = self._examples_prompt(concept, example_types, context)
         
-        if context:
-            prompt = f"""
-Generate concrete examples for the concept "{concept}" based on the following context.
-Provide these types of examples: {example_types_str}
-
-Context:
-{context}
-
-For each example type, provide 1-2 clear, specific examples that would help an analytical
-learner deeply understand the concept. Structure your response with clear headings for
-each example type.
-
-Examples:
-"""
+        scope = make_cache_key(
+            kind="generate_examples", model=self.active_model.model_name,
+            example_types=", ".join(example_types), context=context, temperature=temperature
+        )
+        return self._semantic_cached(
+            scope, concept, lambda: self.generate_completion(prompt, temperature, system_prompt=system_prompt)
+        )
+    
+    def generate_examples_stream(self, concept, example_types, context=None, temperature=0.7):
+        """
+        Stream examples for a concept.
+        
+        Args:
+            concept (str): The concept to generate examples for
+            example_types (list): List of example types to generate
+            context (str, optional): Additional context. Defaults to None.
+            temperature (float, optional): Sampling temperature. Defaults to 0.7.
+        
+        Returns:
+            Iterator[str]: Text deltas of the examples
+        """
+        prompt, system_prompt = self._examples_prompt(concept, example_types, context)
+        
+        scope = make_cache_key(
+            kind="generate_examples", model=self.active_model.model_name,
+            example_types=", ".join(example_types), context=context, temperature=temperature
+        )
+        return self._semantic_cached_stream(
+            scope, concept,
+            lambda: self.generate_completion(prompt, temperature, stream=True, system_prompt=system_prompt)
+        )
+    
+    async def _summarize_level(self, text, level_index, total_levels, temperature=0.5):
+        """
+        Generate a single level of the summary tree.
+        
+        Args:
+            text (str): The text to summarize
+            level_index (int): Zero-based index of the level to generate
+            total_levels (int): Total number of levels in the tree
+            temperature (float, optional): Sampling temperature. Defaults to 0.5.
+        
+        Returns:
+            dict: The summary level with title, content and mapped_sections
+        """
+        level = level_index + 1
+        if level == 1:
+            detail = "the most concise, high-level summary"
+        elif level == total_levels:
+            detail = "comprehensive coverage of the text"
         else:
-            prompt = f"""
-Generate concrete examples for the concept "{concept}".
-Provide these types of examples: {example_types_str}
-
-For each example type, provide 1-2 clear, specific examples that would help an analytical
-learner deeply understand the concept. Structure your response with clear headings for
-each example type.
-
-Examples:
-"""
-        return self.generate_completion(prompt, temperature)
+            detail = f"more detail than level {level - 1}"
+        
+        prompt = SUMMARY_LEVEL_PROMPT.format(text=text, level=level, total_levels=total_levels, detail=detail)
+        level_json = await self.agenerate_completion(
+            prompt, temperature,
+            system_prompt=SUMMARY_LEVEL_SYSTEM_PROMPT,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "SummaryLevel", "schema": SUMMARY_LEVEL_SCHEMA, "strict": True}
+            }
+        )
+        return json.loads(level_json)
     
-    def generate_summary_tree(self, text, levels=3, temperature=0.5):
+    async def agenerate_summary_tree(self, text, levels=3, temperature=0.5):
         """
-        Generate a hierarchical summary tree with multiple levels of abstraction.
+        Generate a hierarchical summary tree, requesting every level concurrently.
         
         Args:
             text (str): The text to summarize
@@ -207,53 +767,65 @@ Examples:
         Returns:
             list: List of summary levels with mappings to original text
         """
-        prompt = f"""
-Create a hierarchical summary tree for the following text, with {levels} levels of abstraction.
-Level 1 should be the most concise, high-level summary.
-Each subsequent level should add more detail, with the final level containing comprehensive coverage.
-
-For each level, provide:
-1. A title for the summary level
-2. The summary content
-3. Mappings to sections in the original text
-
-Return your response as a JSON array with each level having this structure:
-[
-  {{
-    "title": "Level 1: Executive Summary",
-    "content": "The concise level 1 summary...",
-    "mapped_sections": [
-      {{ "title": "Section title", "content": "Original text excerpt" }}
-    ]
-  }},
-  // Additional levels...
-]
-
-Original text:
-{text}
-
-JSON response:
-"""
+        cache_key = make_cache_key(
+            kind="summary_tree", model=self.active_model.model_name,
+            text=text, levels=levels, temperature=temperature
+        )
+        summary_tree = _get_response_cache().get(cache_key)
+        if summary_tree is not None:
+            return summary_tree
+        
         try:
-            summary_tree_json = self.generate_completion(prompt, temperature)
-            summary_tree = json.loads(summary_tree_json)
+            summary_tree = list(await asyncio.gather(
+                *(self._summarize_level(text, i, levels, temperature) for i in range(levels))
+            ))
+            # Cache the parsed tree so repeat requests skip the parse as well
+            _get_response_cache().set(cache_key, summary_tree)
             return summary_tree
-        except json.JSONDecodeError:
-            # Fallback in case of JSON parsing error
-            return [
-                {
-                    "title": "Summary",
-                    "content": "Failed to generate hierarchical summary. Please try again.",
-                    "mapped_sections": []
-                }
-            ]
-        except Exception as e:
-            print(f"Error generating summary tree: {str(e)}")
+        except Exception:
+            log.exception("Error generating summary tree")
             return []
+    
+    def generate_summary_tree(self, text, levels=3, temperature=0.5):
+        """
+        Generate a hierarchical summary tree with multiple levels of abstraction.
+        
+        Args:
+            text (str): The text to summarize
+            levels (int, optional): Number of summary levels. Defaults to 3.
+            temperature (float, optional): Sampling temperature. Defaults to 0.5.
+        
+        Returns:
+            list: List of summary levels with mappings to original text
+        """
+        return run_sync(self.agenerate_summary_tree(text, levels, temperature))
+
+
+class OpenAIAdapter(AIAdapter):
+    """Adapter for a single OpenAI model, configured from arguments or the environment."""
+    
+    def __init__(self, api_key=None, model=None, max_tokens=None):
+        """
+        Initialize the adapter with one model instead of a key.json file.
+        
+        Args:
+            api_key (str, optional): API key. Defaults to the OPENAI_API_KEY environment variable.
+            model (str, optional): Model name. Defaults to DEFAULT_MODEL or "gpt-4".
+            max_tokens (int, optional): Maximum tokens in completion. Defaults to MAX_TOKENS or 1000.
+        """
+        model_config = ModelConfig(
+            name="default",
+            model_name=model or os.getenv("DEFAULT_MODEL", "gpt-4"),
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            max_completion_tokens=max_tokens or int(os.getenv("MAX_TOKENS", "1000"))
+        )
+        self._setup((model_config,))
 
 
 class AIModel:
-    def __init__(self, name, model_name, api_key, base_url=None, max_completion_tokens=1000, extra_body=None):
+    def __init__(self, name, model_name, api_key, base_url=None, max_completion_tokens=1000, extra_body=None,
+                 embedding_model=None, semantic_cache_threshold=0.95,
+                 requests_per_minute=None, tokens_per_minute=None):
         """
         Initialize an AI model client.
         
@@ -264,57 +836,42 @@ class AIModel:
             base_url (str, optional): Base URL for the API
             max_completion_tokens (int, optional): Maximum tokens in completion
             extra_body (dict, optional): Additional parameters for the request
+            embedding_model (str, optional): Embedding model enabling the semantic cache
+            semantic_cache_threshold (float, optional): Cosine similarity needed for a semantic cache hit
+            requests_per_minute (int, optional): Client-side request limit; refreshed from response headers
+            tokens_per_minute (int, optional): Client-side token limit; refreshed from response headers
         """
         self.name = name
         self.model_name = model_name
         self.api_key = api_key
         self.max_completion_tokens = max_completion_tokens
         self.extra_body = extra_body or {}
+        self.embedding_model = embedding_model
+        self.semantic_cache_threshold = semantic_cache_threshold
+        self.rate_budget = RateBudget(requests_per_minute, tokens_per_minute)
         
-        # Initialize the client
-        client_kwargs = {"api_key": api_key}
-        if base_url:
-            client_kwargs["base_url"] = base_url
-        
-        self.client = openai.OpenAI(**client_kwargs)
+        self.base_url = base_url
+    
+    @property
+    def aclient(self):
+        """The async OpenAI client, shared with every model using the same key and endpoint."""
+        return _get_async_client(self.api_key, self.base_url)
     
-    def generate_response(self, messages):
+    def _build_request(self, messages, response_format=None, temperature=None):
         """
-        Generate a response based on the message history.
+        Build the chat completion request arguments from the message history.
         
         Args:
             messages (list): List of message dictionaries with role and content
+            response_format (dict, optional): Structured output format for the API
+            temperature (float, optional): Sampling temperature, or None for the model default
             
         Returns:
-            str: Generated response from the AI model
+            dict: Keyword arguments for chat.completions.create
         """
         # Transform messages for API compatibility
-        api_messages = []
-        
-        for msg in messages:
-            if msg["role"] == "system":
-                # Keep system messages as is
-                api_messages.append(msg)
-            elif msg["role"] == self.name:
-                # Messages from this model become assistant messages
-                api_messages.append({
-                    "role": "assistant",
-                    "content": msg["content"]
-                })
-            else:
-                # Messages from other sources (user or other models) become user messages
-                # with the source prepended to the content
-                source = msg["role"]
-                content = msg["content"]
-                
-                # Only prepend source if it's not already there
-                if not content.startswith(f"{source}:"):
-                    content = f"{source}: {content}"
-                
-                api_messages.append({
-                    "role": "user",
-                    "content": content
-                })
+        name = self.name
+        api_messages = [_rewrite_message(msg, name) for msg in messages]
         
         # Create the completion request
         kwargs = {
@@ -323,16 +880,169 @@ class AIModel:
             "max_tokens": self.max_completion_tokens,
         }
         
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        
+        if response_format:
+            kwargs["response_format"] = response_format
+        
         # Add any additional parameters if provided
         if self.extra_body:
             kwargs.update(self.extra_body)
         
+        return kwargs
+    
+    async def _acall_api(self, kwargs):
+        """
+        Asynchronously call the chat completions API, retrying transient failures with backoff.
+        
+        Waits for rate budget before each attempt and refreshes the budget from
+        the response's rate limit headers.
+        
+        Args:
+            kwargs (dict): Keyword arguments for chat.completions.create
+            
+        Returns:
+            The API response
+        """
+        # Tokenizing the prompt is only worth it when there is a token budget to spend it from
+        tokens = 0
+        if self.rate_budget.limits_tokens:
+            tokens = estimate_tokens(kwargs["messages"], self.model_name, kwargs.get("max_tokens", 0))
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            await self.rate_budget.aacquire(1, tokens)
+            try:
+                raw_response = await self.aclient.chat.completions.with_raw_response.create(**kwargs)
+                self.rate_budget.update_from_headers(raw_response.headers)
+                return raw_response.parse()
+            except _retryable_errors() as e:
+                if attempt == _MAX_ATTEMPTS or not _should_retry(e):
+                    raise
+                delay = _retry_delay(e, attempt)
+                log.warning("Retrying %s in %.1fs after attempt %d failed: %s", self.name, delay, attempt, e)
+                await asyncio.sleep(delay)
+    
+    async def aembed(self, text):
+        """
+        Asynchronously compute an embedding for a piece of text.
+        
+        Args:
+            text (str): The text to embed
+            
+        Returns:
+            list: The embedding vector, or None if embedding failed
+        """
+        cache_key = make_cache_key(kind="embedding", model=self.embedding_model, text=text)
+        embedding = _get_response_cache().get(cache_key)
+        if embedding is not None:
+            return embedding
+        
+        try:
+            response = await self.aclient.embeddings.create(model=self.embedding_model, input=text)
+            embedding = response.data[0].embedding
+            _get_response_cache().set(cache_key, embedding)
+            return embedding
+        except Exception:
+            log.exception("Error computing embedding with %s", self.name)
+            return None
+    
+    def embed(self, text):
+        """
+        Compute an embedding for a piece of text.
+        
+        Args:
+            text (str): The text to embed
+            
+        Returns:
+            list: The embedding vector, or None if embedding failed
+        """
+        return run_sync(self.aembed(text))
+    
+    async def astream_response(self, messages, response_format=None, temperature=None):
+        """
+        Asynchronously stream a response based on the message history.
+        
+        A cached response is yielded in one piece; otherwise the deltas are passed
+        through as they arrive and the full text is cached once the stream completes.
+        If the request or the stream fails, an error message is yielded instead and
+        nothing is cached.
+        
+        Args:
+            messages (list): List of message dictionaries with role and content
+            response_format (dict, optional): Structured output format for the API. Defaults to None.
+            temperature (float, optional): Sampling temperature. Defaults to the model default.
+            
+        Yields:
+            str: Text deltas of the response as they arrive
+        """
+        kwargs = self._build_request(messages, response_format, temperature)
+        cache_key = make_cache_key(**kwargs)
+        cached = _get_response_cache().get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
         try:
-            # Generate completion
-            completion = self.client.chat.completions.create(**kwargs)
+            stream = await self._acall_api(dict(kwargs, stream=True))
+        except Exception as e:
+            log.exception("Error generating response from %s", self.name)
+            yield f"{_ERROR_PREFIX} Failed to generate response: {str(e)}"
+            return
+        
+        parts = []
+        try:
+            async for delta in _aiter_deltas(stream):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            # The partial answer is kept on screen, so the error starts on its own paragraph
+            log.exception("Stream from %s was interrupted", self.name)
+            separator = "\n\n" if parts else ""
+            yield f"{separator}{_ERROR_PREFIX} Failed to generate response: {str(e)}"
+            return
+        _get_response_cache().set(cache_key, "".join(parts))
+    
+    def generate_response(self, messages, stream=False, response_format=None, temperature=None):
+        """
+        Generate a response based on the message history.
+        
+        Args:
+            messages (list): List of message dictionaries with role and content
+            stream (bool, optional): Whether to stream the response. Defaults to False.
+            response_format (dict, optional): Structured output format for the API. Defaults to None.
+            temperature (float, optional): Sampling temperature. Defaults to the model default.
             
-            # Return the generated content
-            return completion.choices[0].message.content
+        Returns:
+            str: Generated response from the AI model, or an iterator of text
+                deltas when streaming
+        """
+        if stream:
+            return iter_sync(self.astream_response(messages, response_format, temperature))
+        return run_sync(self.agenerate_response(messages, response_format, temperature))
+    
+    async def agenerate_response(self, messages, response_format=None, temperature=None):
+        """
+        Asynchronously generate a response based on the message history.
+        
+        Args:
+            messages (list): List of message dictionaries with role and content
+            response_format (dict, optional): Structured output format for the API. Defaults to None.
+            temperature (float, optional): Sampling temperature. Defaults to the model default.
+            
+        Returns:
+            str: Generated response from the AI model
+        """
+        kwargs = self._build_request(messages, response_format, temperature)
+        cache_key = make_cache_key(**kwargs)
+        cached = _get_response_cache().get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            completion = await self._acall_api(kwargs)
+            content = completion.choices[0].message.content
+            _get_response_cache().set(cache_key, content)
+            return content
         except Exception as e:
-            print(f"Error generating response from {self.name}: {str(e)}")
-            return f"[Error] Failed to generate response: {str(e)}"
\ No newline at end of file
+            log.exception("Error generating response from %s", self.name)
+            return f"{_ERROR_PREFIX} Failed to generate response: {str(e)}"
@@ -0,0 +1,86 @@
+"""
+Prompt templates used by the AI adapters.
+Static instructions are sent as a leading system message and the variable parts are
+filled into the user templates below with str.format, so every request for a tool
+shares an identical, cache-friendly prefix.
+"""
+
+QA_SYSTEM_PROMPT = """Given the following context, please answer the question clearly and concisely.
+Only use information from the provided context. If you can't answer based on
+the context, say "I don't have enough information to answer this question."
+"""
+
+EXPLAIN_WITH_CONTEXT_SYSTEM_PROMPT = """Provide a detailed explanation of the line you are given, using the context provided.
+Focus on making the explanation extremely clear and analytical.
+
+Your explanation should cover:
+1. The meaning of the line
+2. Key concepts or terms
+3. How it relates to the broader context
+4. Any implicit assumptions or implications
+"""
+
+EXPLAIN_SYSTEM_PROMPT = """Provide a detailed explanation of the line you are given.
+Focus on making the explanation extremely clear and analytical.
+
+Your explanation should cover:
+1. The meaning of the line
+2. Key concepts or terms
+3. Any implicit assumptions or implications
+4. Examples that clarify the concept (if relevant)
+"""
+
+EXAMPLES_SYSTEM_PROMPT = """Generate concrete examples for the given concept, drawing on the context when one is provided.
+Provide the requested types of examples.
+
+For each example type, provide 1-2 clear, specific examples that would help an analytical
+learner deeply understand the concept. Structure your response with clear headings for
+each example type.
+"""
+
+SUMMARY_LEVEL_SYSTEM_PROMPT = """You write one level of a hierarchical summary tree for the text you are given.
+Level 1 is the most concise, high-level summary. Each subsequent level adds more detail,
+with the final level containing comprehensive coverage.
+
+For the requested level, provide:
+1. A title for the summary level
+2. The summary content
+3. Mappings to sections in the original text
+"""
+
+# Structured output schema for one summary level; the API guarantees conforming JSON
+SUMMARY_LEVEL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "content": {"type": "string"},
+        "mapped_sections": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "content": {"type": "string"}
+                },
+                "required": ["title", "content"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["title", "content", "mapped_sections"],
+    "additionalProperties": False
+}
+
+
+# User message templates; shared context comes first so follow-up requests reuse the prefix
+QA_PROMPT = "Context:\n{context}\n\nQuestion:\n{question}\n\nAnswer:"
+
+EXPLAIN_WITH_CONTEXT_PROMPT = "Context:\n{context}\n\nLine to explain:\n{line}\n\nExplanation:"
+
+EXPLAIN_PROMPT = "Line to explain:\n{line}\n\nExplanation:"
+
+EXAMPLES_WITH_CONTEXT_PROMPT = 'Context:\n{context}\n\nConcept: "{concept}"\nExample types: {example_types}\n\nExamples:'
+
+EXAMPLES_PROMPT = 'Concept: "{concept}"\nExample types: {example_types}\n\nExamples:'
+
+SUMMARY_LEVEL_PROMPT = "Original text:\n{text}\n\nWrite level {level} of {total_levels}: {detail}."
@@ -0,0 +1,135 @@
+"""
+Client-side rate limiting for the AI adapters.
+Requests wait for request/token budget before they are sent, instead of hitting the
+provider's RPM/TPM limits and falling back on retries.
+"""
+
+import time
+import asyncio
+import threading
+from functools import lru_cache
+
+# Seconds over which RPM/TPM budgets refill
+_WINDOW = 60.0
+
+
+@lru_cache(maxsize=8)
+def get_encoder(model):
+    """Return the tokenizer for a model, loaded once per model; unknown models use cl100k_base."""
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def estimate_tokens(messages, model, max_tokens=0):
+    """
+    Estimate how many tokens a chat request will use.
+
+    Args:
+        messages (list): Message dictionaries with role and content
+        model (str): Model name used to pick the tokenizer
+        max_tokens (int, optional): Completion tokens to reserve. Defaults to 0.
+
+    Returns:
+        int: Estimated prompt plus completion tokens
+    """
+    text = "\n".join(msg["content"] for msg in messages)
+    try:
+        prompt_tokens = len(get_encoder(model).encode_ordinary(text))
+    except Exception:
+        # Fallback approximation: ~4 characters per token
+        prompt_tokens = len(text) // 4
+    return prompt_tokens + max_tokens
+
+
+class _Bucket:
+    """Token bucket refilling to `capacity` over one window; None means unlimited."""
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if self.capacity is not None:
+            rate = self.capacity / _WINDOW
+            self.level = min(self.capacity, self.level + (now - self.updated) * rate)
+        self.updated = now
+
+    def take(self, amount):
+        """Withdraw `amount` and return the seconds until the bucket is out of debt."""
+        if self.capacity is None:
+            return 0.0
+        if self.capacity <= 0:
+            # A zero limit has no refill rate; wait out a full window before trying again
+            return _WINDOW
+        self.level -= min(amount, self.capacity)
+        if self.level >= 0:
+            return 0.0
+        return -self.level / (self.capacity / _WINDOW)
+
+
+class RateBudget:
+    """Requests-per-minute and tokens-per-minute budget shared by all calls to a model."""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        """
+        Initialize the rate budget.
+
+        Args:
+            requests_per_minute (int, optional): Request limit, or None for no limit
+            tokens_per_minute (int, optional): Token limit, or None for no limit
+        """
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._lock = threading.Lock()
+
+    @property
+    def limits_tokens(self):
+        """Whether a tokens-per-minute limit is known, from configuration or response headers."""
+        return self._tokens.capacity is not None
+    
+    def _reserve(self, requests, tokens):
+        """Reserve budget and return how long the caller must wait before sending."""
+        now = time.monotonic()
+        with self._lock:
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            return max(self._requests.take(requests), self._tokens.take(tokens))
+
+    async def aacquire(self, requests=1, tokens=0):
+        """
+        Wait without blocking the event loop until the budget allows a request.
+
+        Args:
+            requests (int, optional): Requests to spend. Defaults to 1.
+            tokens (int, optional): Estimated tokens to spend. Defaults to 0.
+        """
+        delay = self._reserve(requests, tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def update_from_headers(self, headers):
+        """
+        Sync the budget with the x-ratelimit-* headers of an API response.
+
+        Args:
+            headers (Mapping): Response headers
+        """
+        now = time.monotonic()
+        with self._lock:
+            for bucket, kind in ((self._requests, "requests"), (self._tokens, "tokens")):
+                try:
+                    limit = headers.get(f"x-ratelimit-limit-{kind}")
+                    remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                    if limit is not None:
+                        bucket.capacity = int(limit)
+                        if bucket.level is None:
+                            bucket.level = bucket.capacity
+                    if remaining is not None and bucket.capacity is not None:
+                        bucket.level = min(bucket.capacity, int(remaining))
+                except ValueError:
+                    continue
+                bucket.updated = now
@@ -1,21 +1,68 @@
+import io
 import re
-import time
+import csv
 import json
-import tiktoken
+import asyncio
+import numpy as np
 from pathlib import Path
+from functools import lru_cache
 import hooks
+from adapters.openai_adapter import run_sync
+from adapters.ratelimit import get_encoder
+from adapters.cache import loads as _loads
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Patterns used by generate_chunks, compiled once
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+_UNDERLINED_HEADING_RE = re.compile(r'^(.+)\n[=\-]{3,}$')
+
+def to_json(value):
+    """
+    Serialize a value as indented JSON text for display or export.
+    
+    Args:
+        value: A JSON-serializable value
+    
+    Returns:
+        str: The JSON text, indented by two spaces
+    """
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(value, indent=2, ensure_ascii=False)
+
 # Token counting function
 def count_tokens(text, model="gpt-3.5-turbo"):
     """Count the number of tokens in a text string."""
     try:
-        encoder = tiktoken.encoding_for_model(model)
-        return len(encoder.encode(text))
-    except:
-        # Fallback approximation: ~4 characters per token
+        encoder = get_encoder(model)
+    except Exception:
+        # Tokenizer unavailable; fallback approximation: ~4 characters per token
         return len(text) // 4
+    # Special tokens are irrelevant for counting, so skip scanning for them
+    return len(encoder.encode_ordinary(text))
 
+@lru_cache(maxsize=1)
+def load_config(config_path="config.json"):
+    """
+    Load the application configuration, once per process.
+    
+    This lives here rather than in app.py because Streamlit re-executes the app
+    script in a fresh namespace on every rerun, which would discard the cache.
+    """
+    return _loads(Path(config_path).read_bytes())
+
+@lru_cache(maxsize=1)
+def load_stylesheet(stylesheet_path="assets/style.css"):
+    """Load the app's custom CSS, once per process."""
+    return Path(stylesheet_path).read_text(encoding="utf-8")
+
+@lru_cache(maxsize=32)
 def load_prompt(prompt_name):
-    """Load a prompt template from the prompts directory."""
+    """Load a prompt template from the prompts directory, once per template."""
     prompt_path = Path("prompts") / f"{prompt_name}.txt"
     try:
         with open(prompt_path, "r", encoding="utf-8") as f:
@@ -23,43 +70,43 @@ def load_prompt(prompt_name):
     except FileNotFoundError:
         raise ValueError(f"Prompt template '{prompt_name}' not found")
 
-def process_text(text, api_adapter):
+@lru_cache(maxsize=32)
+def _split_prompt(prompt_name):
+    """Split a template around its {{TEXT}} marker, or return None unless there is exactly one."""
+    parts = load_prompt(prompt_name).split("{{TEXT}}")
+    return tuple(parts) if len(parts) == 2 else None
+
+def render_prompt(prompt_name, text):
     """
-    Process the input text to generate summary, chunks, and concept map.
+    Fill a prompt template's {{TEXT}} marker with the given text.
     
     Args:
-        text (str): The input text to process
-        api_adapter: The API adapter to use for LLM requests
+        prompt_name (str): Name of the template in the prompts directory
+        text (str): The text to insert
     
     Returns:
-        tuple: (summary, chunks, concept_map)
+        str: The rendered prompt
     """
-    # Apply hooks before processing
-    text = hooks.on_text_process(text)
-    
-    # Generate summary
-    summary_prompt = load_prompt("summary")
-    summary_prompt = summary_prompt.replace("{{TEXT}}", text)
-    summary = api_adapter.generate_completion(summary_prompt)
-    
-    # Apply hooks after summary generation
-    summary = hooks.on_summary_generate(summary)
-    
-    # Generate chunks
-    chunking_prompt = load_prompt("chunking")
-    chunking_prompt = chunking_prompt.replace("{{TEXT}}", text)
-    chunks_json = api_adapter.generate_completion(chunking_prompt)
-    
+    parts = _split_prompt(prompt_name)
+    if parts is None:
+        return load_prompt(prompt_name).replace("{{TEXT}}", text)
+    return parts[0] + text + parts[1]
+
+def _add_estimated_times(chunks):
+    """Add an estimated reading time to each chunk (rough estimation)."""
+    word_counts = np.fromiter((len(chunk["content"].split()) for chunk in chunks), dtype=np.int64, count=len(chunks))
+    # Assuming average reading speed of 200 words per minute; rint rounds half to even like round()
+    times = np.maximum(1, np.rint(word_counts / 200)).astype(np.int64)
+    for chunk, estimated_time in zip(chunks, times.tolist()):
+        chunk["estimated_time"] = estimated_time
+    return chunks
+
+def _parse_chunks(chunks_json, text):
+    """Parse the chunking response, falling back to a single chunk with the full text."""
     try:
         # Parse the JSON response
-        chunks_data = json.loads(chunks_json)
-        chunks = chunks_data.get("chunks", [])
-        
-        # Add estimated reading time for each chunk (rough estimation)
-        for chunk in chunks:
-            word_count = len(chunk["content"].split())
-            # Assuming average reading speed of 200 words per minute
-            chunk["estimated_time"] = max(1, round(word_count / 200))
+        chunks_data = _loads(chunks_json)
+        chunks = _add_estimated_times(chunks_data.get("chunks", []))
     except json.JSONDecodeError:
         # If JSON parsing fails, create a single chunk
         chunks = [{
@@ -67,28 +114,157 @@ def process_text(text, api_adapter):
             "content": text,
             "estimated_time": max(1, round(len(text.split()) / 200))
         }]
+    return chunks
+
+def _parse_concept_map(concept_map_json):
+    """Parse the concept map response, falling back to an empty map."""
+    try:
+        return _loads(concept_map_json)
+    except json.JSONDecodeError:
+        return {"error": "Failed to generate concept map", "nodes": [], "edges": []}
+
+def _parse_combined(combined_json):
+    """
+    Parse the combined analysis response.
     
-    # Apply hooks after chunk generation
-    chunks = hooks.on_chunk_generate(chunks)
-    
-    # Generate concept map
-    concept_map_prompt = load_prompt("concept_map")
-    concept_map_prompt = concept_map_prompt.replace("{{TEXT}}", text)
-    concept_map_json = api_adapter.generate_completion(concept_map_prompt)
-    
+    Returns:
+        tuple: (summary, chunks, concept_map), or None if the response is incomplete
+    """
     try:
-        concept_map = json.loads(concept_map_json)
+        data = _loads(combined_json)
     except json.JSONDecodeError:
-        concept_map = {"error": "Failed to generate concept map", "nodes": [], "edges": []}
+        return None
+    if not isinstance(data, dict):
+        return None
     
-    # Apply hooks after concept map generation
-    concept_map = hooks.on_concept_map_generate(concept_map)
+    summary, chunks, concept_map = data.get("summary"), data.get("chunks"), data.get("concept_map")
+    if not (isinstance(summary, str) and isinstance(chunks, list) and isinstance(concept_map, dict)):
+        return None
+    if not all(isinstance(chunk, dict) and "content" in chunk for chunk in chunks):
+        return None
+    return summary, _add_estimated_times(chunks), concept_map
+
+# Estimated size of a combined response: the chunk contents (the whole text again), a
+# summary of about 20% of the text, and a fixed allowance for the concept map and JSON
+_COMBINED_OUTPUT_RATIO = 1.3
+_COMBINED_OUTPUT_OVERHEAD = 500
+
+def _combined_fits(text, model):
+    """
+    Check whether a combined analysis of the text fits in one completion.
     
+    Args:
+        text (str): The input text to process
+        model: The model that would generate the response
+    
+    Returns:
+        bool: True if the estimated output is within the model's max completion tokens
+    """
+    estimated_tokens = count_tokens(text, model.model_name) * _COMBINED_OUTPUT_RATIO + _COMBINED_OUTPUT_OVERHEAD
+    return estimated_tokens <= model.max_completion_tokens
+
+def apply_text_hooks(text):
+    """
+    Apply the hook that runs before text processing.
+    
+    Args:
+        text (str): The input text
+    
+    Returns:
+        str: The text after any modifications
+    """
+    if hooks.on_text_process:
+        text = hooks.on_text_process(text)
+    return text
+
+def apply_analysis_hooks(summary, chunks, concept_map):
+    """
+    Apply the hooks that run after each generation step.
+    
+    Args:
+        summary (str): The generated summary
+        chunks (list): The generated chunks
+        concept_map (dict): The generated concept map
+    
+    Returns:
+        tuple: (summary, chunks, concept_map) after any modifications
+    """
+    if hooks.on_summary_generate:
+        summary = hooks.on_summary_generate(summary)
+    if hooks.on_chunk_generate:
+        chunks = hooks.on_chunk_generate(chunks)
+    if hooks.on_concept_map_generate:
+        concept_map = hooks.on_concept_map_generate(concept_map)
     return summary, chunks, concept_map
 
+async def aprocess_text(text, api_adapter):
+    """
+    Asynchronously process the input text to generate summary, chunks, and concept map.
+    Short texts are sent once in a combined request; longer texts, or a combined
+    response that is unusable, get the three per-task requests concurrently instead.
+    
+    Hooks are not applied here, since this runs on the adapter's event loop thread;
+    synchronous callers run apply_text_hooks and apply_analysis_hooks around it.
+    
+    Args:
+        text (str): The input text to process
+        api_adapter: The API adapter to use for LLM requests
+    
+    Returns:
+        tuple: (summary, chunks, concept_map)
+    """
+    # The combined response repeats the whole text as chunk content, so it is only worth
+    # a request when the estimated output fits in the model's completion budget
+    combined = None
+    if _combined_fits(text, api_adapter.active_model):
+        combined = _parse_combined(await api_adapter.agenerate_completion(
+            render_prompt("combined", text), response_format={"type": "json_object"}
+        ))
+    
+    if combined is not None:
+        summary, chunks, concept_map = combined
+    else:
+        summary, chunks_json, concept_map_json = await asyncio.gather(
+            api_adapter.agenerate_completion(render_prompt("summary", text)),
+            api_adapter.agenerate_completion(render_prompt("chunking", text)),
+            api_adapter.agenerate_completion(render_prompt("concept_map", text))
+        )
+        chunks = _parse_chunks(chunks_json, text)
+        concept_map = _parse_concept_map(concept_map_json)
+    
+    return summary, chunks, concept_map
+
+def process_text(text, api_adapter):
+    """
+    Process the input text to generate summary, chunks, and concept map.
+    
+    Args:
+        text (str): The input text to process
+        api_adapter: The API adapter to use for LLM requests
+    
+    Returns:
+        tuple: (summary, chunks, concept_map)
+    """
+    text = apply_text_hooks(text)
+    return apply_analysis_hooks(*run_sync(aprocess_text(text, api_adapter)))
+
+@lru_cache(maxsize=256)
+def _highlight_pattern(phrases):
+    """
+    Compile one case-insensitive alternation matching any of the phrases literally.
+    
+    Args:
+        phrases (tuple): Phrases ordered longest first, so the longest match wins
+    
+    Returns:
+        re.Pattern: The compiled pattern
+    """
+    return re.compile("|".join(map(re.escape, phrases)), re.IGNORECASE)
+
 def highlight_text(text, phrases_to_highlight):
     """
     Add HTML highlighting to specific phrases in text.
+    All phrases are matched in a single pass over the text.
     
     Args:
         text (str): The text to highlight
@@ -97,21 +273,32 @@ def highlight_text(text, phrases_to_highlight):
     Returns:
         str: HTML-formatted text with highlights
     """
-    highlighted_text = text
-    for phrase in phrases_to_highlight:
-        if not phrase or len(phrase) < 3:
-            continue  # Skip very short phrases
-            
-        # Escape special regex characters
-        escaped_phrase = re.escape(phrase)
-        # Add highlight span tags
-        highlighted_text = re.sub(
-            f"({escaped_phrase})",
-            r'<span class="highlight">\1</span>',
-            highlighted_text,
-            flags=re.IGNORECASE
-        )
-    return highlighted_text
+    # Skip very short phrases
+    phrases = {phrase for phrase in phrases_to_highlight if phrase and len(phrase) >= 3}
+    
+    # Drop phrases that cannot occur before they reach the regex. Only ASCII phrases against
+    # ASCII text are checked, where lower() agrees exactly with IGNORECASE matching.
+    if phrases and text.isascii():
+        text_lower = text.lower()
+        phrases = {phrase for phrase in phrases if not phrase.isascii() or phrase.lower() in text_lower}
+    if not phrases:
+        return text
+    
+    # Add highlight span tags, joining the text between matches once at the end
+    pattern = _highlight_pattern(tuple(sorted(phrases, key=lambda phrase: (-len(phrase), phrase))))
+    parts = []
+    last = 0
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        parts.append(text[last:start])
+        parts.append('<span class="highlight">')
+        parts.append(text[start:end])
+        parts.append('</span>')
+        last = end
+    if not parts:
+        return text
+    parts.append(text[last:])
+    return "".join(parts)
 
 def create_concept_map(concept_data):
     """
@@ -128,34 +315,171 @@ def create_concept_map(concept_data):
     # create a proper visualization using a library like Graphviz or d3.js
     return concept_data
 
-def convert_to_flashcards(text, api_adapter):
+def index_related_concepts(concept_map):
+    """
+    Build the list of related concepts for every node in one pass over the edges.
+    
+    Args:
+        concept_map (dict): The concept map data with "nodes" and "edges"
+    
+    Returns:
+        dict: Node id mapped to a list of (related concept label, relation) tuples
+    """
+    node_by_id = {node.get("id"): node for node in concept_map.get("nodes", [])}
+    related = {}
+    for edge in concept_map.get("edges", []):
+        target_node = node_by_id.get(edge.get("target"))
+        if target_node:
+            related.setdefault(edge.get("source"), []).append(
+                (target_node.get("label", "Related concept"), edge.get("label", "relates to"))
+            )
+    return related
+
+def convert_to_flashcards(text, api_adapter, max_span_size=3000):
     """
     Convert text to flashcards using the API.
+    Long text is split into spans that are converted concurrently.
     
     Args:
         text (str): The text to convert to flashcards
         api_adapter: The API adapter to use for LLM requests
+        max_span_size (int): Maximum span size in characters per request
     
     Returns:
         list: List of flashcard dictionaries with 'question' and 'answer' keys
     """
-    flashcard_prompt = load_prompt("flashcard")
-    flashcard_prompt = flashcard_prompt.replace("{{TEXT}}", text)
-    flashcard_json = api_adapter.generate_completion(flashcard_prompt)
+    spans = [chunk["content"] for chunk in generate_chunks(text, max_span_size // 2, max_span_size)] or [text]
+    responses = api_adapter.batch_completions(
+        [render_prompt("flashcard", span) for span in spans]
+    )
     
-    try:
-        # Parse the JSON response
-        flashcards_data = json.loads(flashcard_json)
-        flashcards = flashcards_data.get("flashcards", [])
-    except json.JSONDecodeError:
-        # If JSON parsing fails, return empty list
-        flashcards = []
+    flashcards = []
+    for flashcard_json in responses:
+        try:
+            # Parse the JSON response
+            flashcards_data = _loads(flashcard_json)
+            flashcards.extend(flashcards_data.get("flashcards", []))
+        except json.JSONDecodeError:
+            # If JSON parsing fails, skip this span
+            continue
     
     # Apply hooks after flashcard creation
-    flashcards = hooks.on_flashcard_create(flashcards)
+    if hooks.on_flashcard_create:
+        flashcards = hooks.on_flashcard_create(flashcards)
     
     return flashcards
 
+def flashcards_to_csv(flashcards):
+    """
+    Format flashcards as CSV for Anki import.
+    
+    Args:
+        flashcards (list): List of flashcard dictionaries with 'question' and 'answer' keys
+    
+    Returns:
+        str: CSV text with a question,answer header and every field quoted
+    """
+    buffer = io.StringIO()
+    buffer.write("question,answer\n")
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    writer.writerows((card["question"], card["answer"]) for card in flashcards)
+    return buffer.getvalue()
+
+def _heading_title(para):
+    """
+    Return the title of a '#' or underlined heading paragraph.
+    
+    Most paragraphs are rejected by a first-character or last-character check, so
+    the underline regex only runs on the few that could be headings.
+    
+    Args:
+        para (str): A single paragraph
+    
+    Returns:
+        str: The heading title, or None if the paragraph is not a heading
+    """
+    if para[:1] == '#':
+        # Equivalent to ^#{1,6}\s+(.+)$ without the regex engine
+        level = len(para) - len(para.lstrip('#'))
+        if level <= 6:
+            body = para[level:]
+            if body.endswith('\n'):
+                body = body[:-1]
+            title = body.lstrip()
+            if body[:1].isspace():
+                if title and '\n' not in title:
+                    return title
+                if not title and len(body) > 1 and body[-1] != '\n':
+                    return body[-1]
+    
+    if '\n' in para and para.rstrip().endswith(('=', '-')):
+        underlined = _UNDERLINED_HEADING_RE.match(para)
+        if underlined:
+            return underlined.group(1)
+    return None
+
+
+def _first_sentence(para):
+    """
+    Return the text up to and including the first '.', '!' or '?'.
+    
+    Args:
+        para (str): A single paragraph
+    
+    Returns:
+        str: The first sentence, or None if the paragraph has no terminator or starts with one
+    """
+    end = min((i for i in (para.find('.'), para.find('!'), para.find('?')) if i >= 0), default=-1)
+    if end <= 0:
+        return None
+    return para[:end + 1]
+
+
+# Paragraph kinds used by the chunk planner
+_PARAGRAPH, _MINOR_HEADING, _MAJOR_HEADING = 0, 1, 2
+
+
+def _plan_chunks(sizes, kinds, min_chunk_size, max_chunk_size):
+    """
+    Decide where chunks start and end from paragraph sizes and kinds alone.
+    
+    Args:
+        sizes (list): Character count of each paragraph
+        kinds (list): _PARAGRAPH, _MINOR_HEADING or _MAJOR_HEADING for each paragraph
+        min_chunk_size (int): Minimum chunk size in characters
+        max_chunk_size (int): Maximum chunk size in characters
+    
+    Returns:
+        list: (start, end, title_index) paragraph ranges, where title_index is the
+            paragraph that names the chunk, or -1 for the introduction
+    """
+    plan = []
+    start = 0
+    current_size = 0
+    title_index = -1
+    
+    for i, (para_size, kind) in enumerate(zip(sizes, kinds)):
+        if kind != _PARAGRAPH:
+            # If we have content and either this is a major heading or the chunk is big enough
+            if i > start and (kind == _MAJOR_HEADING or current_size >= min_chunk_size):
+                plan.append((start, i, title_index))
+                start, current_size, title_index = i, para_size, i
+            else:
+                current_size += para_size
+                if kind == _MAJOR_HEADING:
+                    title_index = i
+        elif current_size + para_size > max_chunk_size and current_size >= min_chunk_size:
+            # Adding this paragraph would exceed max_chunk_size, so it starts a new chunk
+            plan.append((start, i, title_index))
+            start, current_size, title_index = i, para_size, i
+        else:
+            current_size += para_size
+    
+    if start < len(sizes):
+        plan.append((start, len(sizes), title_index))
+    return plan
+
+
 def generate_chunks(text, min_chunk_size=500, max_chunk_size=1500):
     """
     Simple rule-based chunking algorithm that respects paragraph and section boundaries.
@@ -170,69 +494,38 @@ def generate_chunks(text, min_chunk_size=500, max_chunk_size=1500):
         list: List of chunk dictionaries
     """
     # Split by double newlines (paragraphs)
-    paragraphs = re.split(r'\n\s*\n', text)
-    
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    current_title = "Introduction"
+    paragraphs = _PARAGRAPH_BREAK_RE.split(text)
     
+    # Classify every paragraph once; the chunk boundaries are then planned on sizes alone
+    sizes = []
+    words = []
+    kinds = []
+    headings = []
     for para in paragraphs:
-        para_size = len(para)
-        
-        # Check if this is a heading
-        heading_match = re.match(r'^#{1,6}\s+(.+)$', para) or re.match(r'^(.+)\n[=\-]{3,}$', para)
-        
-        if heading_match:
-            # If we have content and either this is a major heading or the chunk is big enough
-            if current_chunk and (para.startswith('# ') or current_size >= min_chunk_size):
-                # Save the current chunk
-                chunk_content = '\n\n'.join(current_chunk)
-                chunks.append({
-                    "title": current_title,
-                    "content": chunk_content,
-                    "estimated_time": max(1, round(len(chunk_content.split()) / 200))
-                })
-                
-                # Start a new chunk with the heading
-                current_title = heading_match.group(1)
-                current_chunk = [para]
-                current_size = para_size
-            else:
-                # Add heading to current chunk
-                current_chunk.append(para)
-                current_size += para_size
-                # Update title if this is the first content or a major heading
-                if not current_chunk or para.startswith('# '):
-                    current_title = heading_match.group(1)
+        heading = _heading_title(para)
+        sizes.append(len(para))
+        words.append(len(para.split()))
+        if heading is not None:
+            kinds.append(_MAJOR_HEADING if para.startswith('# ') else _MINOR_HEADING)
+            headings.append(heading)
         else:
-            # If adding this paragraph would exceed max_chunk_size, start a new chunk
-            if current_size + para_size > max_chunk_size and current_size >= min_chunk_size:
-                chunk_content = '\n\n'.join(current_chunk)
-                chunks.append({
-                    "title": current_title,
-                    "content": chunk_content,
-                    "estimated_time": max(1, round(len(chunk_content.split()) / 200))
-                })
-                
-                # Start new chunk with this paragraph
-                # Use the first sentence as title if not a heading
-                first_sentence = re.match(r'^([^.!?]+[.!?])', para)
-                current_title = (first_sentence.group(1) if first_sentence else "Continued") + "..."
-                current_chunk = [para]
-                current_size = para_size
-            else:
-                # Add to current chunk
-                current_chunk.append(para)
-                current_size += para_size
+            kinds.append(_PARAGRAPH)
+            headings.append(None)
     
-    # Add the last chunk if there's anything left
-    if current_chunk:
-        chunk_content = '\n\n'.join(current_chunk)
+    chunks = []
+    for start, end, title_index in _plan_chunks(sizes, kinds, min_chunk_size, max_chunk_size):
+        if title_index < 0:
+            title = "Introduction"
+        elif headings[title_index] is not None:
+            title = headings[title_index]
+        else:
+            # Use the first sentence as title if not a heading
+            title = (_first_sentence(paragraphs[title_index]) or "Continued") + "..."
+        
         chunks.append({
-            "title": current_title,
-            "content": chunk_content,
-            "estimated_time": max(1, round(len(chunk_content.split()) / 200))
+            "title": title,
+            "content": '\n\n'.join(paragraphs[start:end]),
+            "estimated_time": max(1, round(sum(words[start:end]) / 200))
         })
     
     return chunks
@@ -3,9 +3,13 @@ Custom widgets for the AI Learning Framework.
 These widgets extend the base Streamlit functionality.
 """
 
+import json
 import streamlit as st
 import pandas as pd
-import uuid
+from collections import defaultdict, deque
+
+# Label indents for the usual concept tree depths
+_INDENTS = tuple("  " * level for level in range(8))
 
 def flashcard_viewer(flashcards, key_prefix="fc"):
     """
@@ -29,19 +33,18 @@ def flashcard_viewer(flashcards, key_prefix="fc"):
         # Study mode with flip cards
         st.write("### Flashcard Study")
         
-        # Initialize state for current card if not exists
-        if f"{key_prefix}_current_card" not in st.session_state:
-            st.session_state[f"{key_prefix}_current_card"] = 0
+        # Build the session state keys once per render
+        current_key = f"{key_prefix}_current_card"
         
         # Get current card index
-        current_idx = st.session_state[f"{key_prefix}_current_card"]
+        current_idx = st.session_state.get(current_key, 0)
         
         # Display card navigation
         col1, col2, col3 = st.columns([1, 3, 1])
         with col1:
             if current_idx > 0:
                 if st.button("← Previous", key=f"{key_prefix}_prev"):
-                    st.session_state[f"{key_prefix}_current_card"] -= 1
+                    st.session_state[current_key] = current_idx - 1
                     st.rerun()
         
         with col2:
@@ -50,7 +53,7 @@ def flashcard_viewer(flashcards, key_prefix="fc"):
         with col3:
             if current_idx < len(flashcards) - 1:
                 if st.button("Next →", key=f"{key_prefix}_next"):
-                    st.session_state[f"{key_prefix}_current_card"] += 1
+                    st.session_state[current_key] = current_idx + 1
                     st.rerun()
         
         # Display current card
@@ -59,15 +62,14 @@ def flashcard_viewer(flashcards, key_prefix="fc"):
         st.write(card["question"])
         
         # Show/hide answer
-        if f"{key_prefix}_show_answer_{current_idx}" not in st.session_state:
-            st.session_state[f"{key_prefix}_show_answer_{current_idx}"] = False
+        show_key = f"{key_prefix}_show_answer_{current_idx}"
+        show_answer = st.session_state.get(show_key, False)
         
-        if st.button("Show Answer" if not st.session_state[f"{key_prefix}_show_answer_{current_idx}"] 
-                     else "Hide Answer", key=f"{key_prefix}_toggle_{current_idx}"):
-            st.session_state[f"{key_prefix}_show_answer_{current_idx}"] = not st.session_state[f"{key_prefix}_show_answer_{current_idx}"]
+        if st.button("Hide Answer" if show_answer else "Show Answer", key=f"{key_prefix}_toggle_{current_idx}"):
+            st.session_state[show_key] = not show_answer
             st.rerun()
         
-        if st.session_state[f"{key_prefix}_show_answer_{current_idx}"]:
+        if show_answer:
             st.write("#### Answer:")
             st.write(card["answer"])
     
@@ -75,12 +77,11 @@ def flashcard_viewer(flashcards, key_prefix="fc"):
         # List view of all cards
         st.write("### All Flashcards")
         
-        for i, card in enumerate(flashcards):
-            with st.expander(f"Card {i+1}: {card['question'][:50]}..."):
-                st.write("**Question:**")
-                st.write(card["question"])
-                st.write("**Answer:**")
-                st.write(card["answer"])
+        # One table for every card instead of an expander per card
+        df = pd.DataFrame(flashcards, columns=["question", "answer"])
+        df.columns = ["Question", "Answer"]
+        df.index = pd.RangeIndex(1, len(df) + 1, name="Card")
+        st.dataframe(df, width="stretch")
 
 def progress_dashboard(chunks, completed_chunks):
     """
@@ -95,6 +96,24 @@ def progress_dashboard(chunks, completed_chunks):
     """
     st.write("### Learning Progress")
     
+    # Collect totals and table columns in a single pass over the chunks
+    if not isinstance(completed_chunks, (set, frozenset)):
+        completed_chunks = frozenset(completed_chunks)
+    total_estimated_time = 0
+    completed_time = 0
+    title_col = []
+    status_col = []
+    time_col = []
+    for i, chunk in enumerate(chunks):
+        estimated_time = chunk.get("estimated_time", 0)
+        is_completed = i in completed_chunks
+        total_estimated_time += estimated_time
+        if is_completed:
+            completed_time += estimated_time
+        title_col.append(chunk.get("title", f"Chunk {i+1}"))
+        status_col.append("Completed" if is_completed else "Pending")
+        time_col.append(f"{estimated_time} min")
+    
     # Overall progress
     total_chunks = len(chunks)
     total_completed = len(completed_chunks)
@@ -108,8 +127,6 @@ def progress_dashboard(chunks, completed_chunks):
     st.write(f"Overall Progress: {progress_percentage:.1f}%")
     
     # Calculate estimated time remaining
-    total_estimated_time = sum(chunk.get("estimated_time", 0) for chunk in chunks)
-    completed_time = sum(chunks[i].get("estimated_time", 0) for i in completed_chunks if i < len(chunks))
     remaining_time = total_estimated_time - completed_time
     
     col1, col2, col3 = st.columns(3)
@@ -124,71 +141,82 @@ def progress_dashboard(chunks, completed_chunks):
     st.write("### Chunk Details")
     
     # Create a DataFrame for better display
-    chunk_data = []
-    for i, chunk in enumerate(chunks):
-        chunk_data.append({
-            "Chunk": i + 1,
-            "Title": chunk.get("title", f"Chunk {i+1}"),
-            "Status": "Completed" if i in completed_chunks else "Pending",
-            "Est. Time": f"{chunk.get('estimated_time', 0)} min"
+    if chunks:
+        # Columns go straight into the DataFrame, skipping the row-to-column pivot
+        df = pd.DataFrame({
+            "Chunk": range(1, total_chunks + 1),
+            "Title": title_col,
+            "Status": status_col,
+            "Est. Time": time_col
         })
-    
-    if chunk_data:
-        df = pd.DataFrame(chunk_data)
         st.dataframe(df, hide_index=True)
 
-def concept_tree_view(concept_map):
+@st.cache_data(show_spinner=False)
+def _index_concept_map(concept_map_json):
     """
-    Display a hierarchical tree view of concepts.
+    Build the lookups concept_tree_view walks, cached across reruns.
     
     Args:
-        concept_map (dict): Concept map data with nodes and edges
+        concept_map_json (str): Concept map serialized with sorted keys, used as the cache key
     
     Returns:
-        None
+        tuple: (node_lookup, children, root_node_ids)
     """
-    if not concept_map or "nodes" not in concept_map or "edges" not in concept_map:
-        st.info("No concept map data available.")
-        return
-    
-    st.write("### Concept Hierarchy")
-    
-    # Build a tree structure from edges
+    concept_map = json.loads(concept_map_json)
     nodes = concept_map["nodes"]
     edges = concept_map["edges"]
     
     # Find root nodes (nodes with no parents)
-    child_nodes = set(edge["target"] for edge in edges)
-    root_node_ids = [node["id"] for node in nodes if node["id"] not in child_nodes]
+    child_nodes = {edge["target"] for edge in edges}
+    root_node_ids = tuple(node["id"] for node in nodes if node["id"] not in child_nodes)
     
     # Build child lookup
-    children = {}
+    children = defaultdict(list)
     for edge in edges:
-        source = edge["source"]
-        target = edge["target"]
-        if source not in children:
-            children[source] = []
-        children[source].append(target)
+        children[edge["source"]].append(edge["target"])
+    children = {source: tuple(targets) for source, targets in children.items()}
     
     # Node lookup
     node_lookup = {node["id"]: node for node in nodes}
     
-    # Recursive function to display the tree
-    def display_node(node_id, level=0):
+    return node_lookup, children, root_node_ids
+
+def concept_tree_view(concept_map):
+    """
+    Display a hierarchical tree view of concepts.
+    
+    Args:
+        concept_map (dict): Concept map data with nodes and edges
+    
+    Returns:
+        None
+    """
+    if not concept_map or "nodes" not in concept_map or "edges" not in concept_map:
+        st.info("No concept map data available.")
+        return
+    
+    st.write("### Concept Hierarchy")
+    
+    # The tree structure is rebuilt only when the concept map changes
+    node_lookup, children, root_node_ids = _index_concept_map(json.dumps(concept_map, sort_keys=True))
+    
+    # Walk the tree depth-first with an explicit stack, rendering nodes in pre-order.
+    # Each entry carries the node's ancestors so a cycle in the map ends instead of looping.
+    stack = deque((root_id, 0, frozenset()) for root_id in reversed(root_node_ids))
+    while stack:
+        node_id, level, ancestors = stack.pop()
         node = node_lookup.get(node_id, {"label": f"Unknown Node {node_id}"})
-        indent = "  " * level
+        indent = _INDENTS[level] if level < len(_INDENTS) else "  " * level
         expander_label = f"{indent}{'└─ ' if level > 0 else ''}{node.get('label', node_id)}"
         
+        # Streamlit does not allow nested expanders, so the hierarchy is shown by indentation
         with st.expander(expander_label, expanded=(level < 1)):
             st.write(node.get("description", "No description available."))
-            
-            if node_id in children:
-                for child_id in children[node_id]:
-                    display_node(child_id, level + 1)
-    
-    # Display from root nodes
-    for root_id in root_node_ids:
-        display_node(root_id)
+        
+        ancestors = ancestors | {node_id}
+        for child_id in reversed(children.get(node_id, ())):
+            if child_id not in ancestors:
+                stack.append((child_id, level + 1, ancestors))
 
 def summary_tree_view(summaries_tree):
     """